@@ -2,14 +2,23 @@
 # To run this file:
 # 1. pip install fastapi "uvicorn[standard]" email-validator
 # 2. uvicorn main:app --reload
+#    or, to serve without reload on uvloop + httptools with access logs off: python main.py
+#    (uvloop is only installed by uvicorn[standard] where sys_platform != 'win32')
 
 from fastapi import FastAPI, Query, Request, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from pydantic import (BaseModel, EmailStr, Field, field_validator)
-from typing import Any, Dict, List, Optional
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import (BaseModel, ConfigDict, EmailStr, Field, PrivateAttr, TypeAdapter, ValidationError, field_validator)
+from typing import Any, Callable, Counter, Dict, List, Literal, Optional, Tuple, Type
 from datetime import date, datetime, timezone
+import collections
+import functools
+import itertools
+import json
 import re
+import sys
+import time
 
 # --- 1. Custom Exception & Response Models ---
 
@@ -47,11 +56,53 @@ class Conflict(AppException):
         )
 
 # --- 2. FastAPI App Initialization & Exception Handlers ---
+
+class ModelJSONRequest(Request):
+    """Request whose JSON body is parsed and validated in one step with model_validate_json."""
+    def __init__(self, scope, receive, body_model: Type[BaseModel]):
+        super().__init__(scope, receive)
+        self.body_model = body_model
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            try:
+                self._json = self.body_model.model_validate_json(body)
+            except ValidationError:
+                # Hand FastAPI the plain payload so it reports the errors in its usual shape
+                self._json = json.loads(body)
+        return self._json
+
+class ModelJSONRoute(APIRoute):
+    """Route that validates a single Pydantic model body straight from the raw request bytes."""
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+        body_params = self.dependant.body_params
+        body_model = body_params[0].field_info.annotation if len(body_params) == 1 else None
+        if not (isinstance(body_model, type) and issubclass(body_model, BaseModel)):
+            return original_route_handler
+
+        async def custom_route_handler(request: Request) -> Response:
+            return await original_route_handler(ModelJSONRequest(request.scope, request.receive, body_model))
+
+        return custom_route_handler
+
 app = FastAPI(
     title="Enhanced University Course Management API",
     description="A complete API to manage students, courses, and enrollments with structured error and success responses.",
     version="3.0.0"
 )
+app.router.route_class = ModelJSONRoute
+
+_timestamp_cache: List[Any] = [0, ""]
+
+def now_iso() -> str:
+    """Returns the current UTC time as an ISO string, re-formatted at most once per second."""
+    now = int(time.time())
+    if now != _timestamp_cache[0]:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = datetime.fromtimestamp(now, timezone.utc).isoformat()
+    return _timestamp_cache[1]
 
 @app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
@@ -59,7 +110,7 @@ async def app_exception_handler(request: Request, exc: AppException):
     content = {
         "detail": exc.detail,
         "error_code": exc.error_code,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": now_iso(),
         **exc.extra_info
     }
     return JSONResponse(
@@ -67,28 +118,36 @@ async def app_exception_handler(request: Request, exc: AppException):
         content=content,
     )
 
-@app.exception_handler(RequestValidationError)
-async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    """Handles Pydantic validation errors to provide a structured field_errors response."""
+@functools.lru_cache(maxsize=256)
+def render_validation_errors(errors: Tuple[Tuple[Tuple[Any, ...], str], ...]) -> bytes:
+    """Serializes the field_errors body for a set of (loc, msg) pairs, leaving it open for the timestamp."""
     field_errors = {}
-    for error in exc.errors():
+    for loc, msg in errors:
         # Use a tuple for the location to handle nested models
-        field_name = " -> ".join(map(str, error["loc"][1:]))
+        field_name = " -> ".join(map(str, loc[1:]))
         if field_name not in field_errors:
             field_errors[field_name] = []
-        field_errors[field_name].append(error["msg"])
+        field_errors[field_name].append(msg)
+    return json.dumps({"detail": "Validation failed", "field_errors": field_errors}, separators=(",", ":")).encode()[:-1]
 
-    return JSONResponse(
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """Handles Pydantic validation errors to provide a structured field_errors response."""
+    errors = tuple((tuple(error["loc"]), error["msg"]) for error in exc.errors())
+    timestamp = now_iso()
+    return Response(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={
-            "detail": "Validation failed",
-            "field_errors": field_errors,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        },
+        content=render_validation_errors(errors) + f',"timestamp":"{timestamp}"}}'.encode(),
+        media_type="application/json",
     )
 
 # --- 3. Pydantic Models (Data Schemas) ---
 
+# Stored records are mutated in place by the update endpoints, whose inputs are already validated
+STORED_MODEL_CONFIG = ConfigDict(extra='forbid', validate_assignment=False)
+
+COURSE_CODE_PATTERN = re.compile(r'^[A-Z]{2,4}\d{3}$')
+
 # Professor Schemas
 class ProfessorBase(BaseModel):
     name: str = Field(..., example="Dr. Grace Hopper")
@@ -110,6 +169,7 @@ class ProfessorUpdate(BaseModel):
     department: Optional[str] = Field(None, example="Electrical Engineering")
 
 class Professor(ProfessorBase):
+    model_config = STORED_MODEL_CONFIG
     id: int
     hire_date: date
 
@@ -122,7 +182,7 @@ class CourseBase(BaseModel):
 
     @field_validator('code')
     def validate_course_code(cls, v):
-        if not re.match(r'^[A-Z]{2,4}\d{3}$', v):
+        if not COURSE_CODE_PATTERN.match(v):
             raise ValueError('Invalid course code format. Use format like "CS101" or "MATH203".')
         return v.upper()
 
@@ -137,6 +197,7 @@ class CourseUpdate(BaseModel):
     professor_id: Optional[int] = Field(None, example=1)
 
 class Course(CourseBase):
+    model_config = STORED_MODEL_CONFIG
     id: int
     professor_id: int
     enrolled_students: int = 0
@@ -158,11 +219,17 @@ class StudentUpdate(BaseModel):
     year: Optional[int] = Field(None, ge=1, le=5)
 
 class Student(StudentBase):
+    model_config = STORED_MODEL_CONFIG
     id: int
     gpa: float = Field(default=0.0, ge=0.0, le=4.0)
     academic_probation: bool = Field(default=False, description="True if GPA is below 2.0")
+    # Running GPA totals over graded enrollments: sum(points * credits) and sum(credits)
+    _total_points: float = PrivateAttr(default=0.0)
+    _total_credits: int = PrivateAttr(default=0)
 
 # Enrollment Schemas
+Grade = Literal["A", "B", "C", "D", "F"]
+
 class EnrollmentBase(BaseModel):
     student_id: int = Field(..., example=1)
     course_id: int = Field(..., example=1)
@@ -171,9 +238,10 @@ class EnrollmentCreate(EnrollmentBase):
     pass
 
 class Enrollment(EnrollmentBase):
+    model_config = STORED_MODEL_CONFIG
     id: str
     enrollment_date: date = Field(default_factory=date.today)
-    grade: Optional[str] = Field(None, pattern=r'^[A-DF]$', example="A")
+    grade: Optional[Grade] = Field(None, example="A")
 
 class EnrollmentSuccessResponse(BaseModel):
     message: str = "Student successfully enrolled"
@@ -199,85 +267,214 @@ db = {
 }
 
 # ID Counters & GPA Mapping
-next_professor_id = 2
-next_student_id = 2
-next_course_id = 2
-next_enrollment_id = 2
+_professor_ids = itertools.count(2)
+_student_ids = itertools.count(2)
+_course_ids = itertools.count(2)
+_enrollment_ids = itertools.count(2)
 GRADE_TO_POINTS = {"A": 4.0, "B": 3.0, "C": 2.0, "D": 1.0, "F": 0.0}
 
+# Email Index: lower-cased email -> (owner type, owner id), shared by professors and students
+_email_index: Dict[str, Tuple[str, int]] = {
+    **{p.email.lower(): ("professor", p.id) for p in db["professors"].values()},
+    **{s.email.lower(): ("student", s.id) for s in db["students"].values()},
+}
+
+# Enrollment Indexes: student id -> enrollment ids, course id -> enrollment ids, (student id, course id) -> enrollment id.
+# The id buckets are dicts used as ordered sets, so rosters and schedules come back in enrollment order.
+_enr_by_student: Dict[int, Dict[str, None]] = {}
+_enr_by_course: Dict[int, Dict[str, None]] = {}
+_enr_by_pair: Dict[Tuple[int, int], str] = {}
+
+# Filter Indexes: case-folded department -> professor ids, case-folded major -> student ids.
+# Buckets are insertion-ordered dicts used as ordered sets, kept in id (creation) order.
+_prof_by_dept: Dict[str, Dict[int, None]] = collections.defaultdict(dict)
+_stud_by_major: Dict[str, Dict[int, None]] = collections.defaultdict(dict)
+
+# Analytics Counters: students per GPA bucket, total enrolled seats, and enrolled seats -> number of courses
+_gpa_distribution: Dict[str, int] = {"0.0-0.99": 0, "1.0-1.99": 0, "2.0-2.99": 0, "3.0-4.0": 0, "Not Graded": 0}
+_enrollment_total = sum(c.enrolled_students for c in db["courses"].values())
+_seat_counts: Counter[int] = collections.Counter(c.enrolled_students for c in db["courses"].values())
+
+# Record Versions: bumped whenever a stored record of that resource is mutated in place, keying cached GET-by-id bodies.
+# Creates and deletes need no bump: ids are never reused and deleted ids 404 before the cache is consulted.
+_record_versions: Dict[str, int] = {"professors": 0, "students": 0, "courses": 0}
+
 # --- 5. Helper Functions ---
-def calculate_gpa(student_id: int):
+def apply_grade_change(student_id: int, old_grade: Optional[str], new_grade: Optional[str], credits: int, new_credits: Optional[int] = None):
+    """Moves one enrollment's contribution in a student's running GPA totals from (old_grade, credits) to (new_grade, new_credits)."""
     student = db["students"].get(student_id)
     if not student: return
-    total_points, total_credits = 0, 0
-    student_enrollments = [e for e in db["enrollments"].values() if e.student_id == student_id and e.grade]
-    for enrollment in student_enrollments:
-        course = db["courses"].get(enrollment.course_id)
-        if course and enrollment.grade in GRADE_TO_POINTS:
-            total_points += GRADE_TO_POINTS[enrollment.grade] * course.credits
-            total_credits += course.credits
-    student.gpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
+    if new_credits is None: new_credits = credits
+    _gpa_distribution[gpa_bucket(student)] -= 1
+    if old_grade is not None:
+        student._total_points -= GRADE_TO_POINTS[old_grade] * credits
+        student._total_credits -= credits
+    if new_grade is not None:
+        student._total_points += GRADE_TO_POINTS[new_grade] * new_credits
+        student._total_credits += new_credits
+    student.gpa = round(student._total_points / student._total_credits, 2) if student._total_credits > 0 else 0.0
     student.academic_probation = student.gpa < 2.0
+    _gpa_distribution[gpa_bucket(student)] += 1
+    _record_versions["students"] += 1
+
+def gpa_bucket(student: Student) -> str:
+    if student._total_credits == 0: return "Not Graded"
+    if student.gpa < 1.0: return "0.0-0.99"
+    if student.gpa < 2.0: return "1.0-1.99"
+    if student.gpa < 3.0: return "2.0-2.99"
+    return "3.0-4.0"
+
+def track_seats(seats: int, delta: int):
+    _seat_counts[seats] += delta
+    if not _seat_counts[seats]:
+        del _seat_counts[seats]
+
+def adjust_enrolled_students(course: Course, delta: int):
+    global _enrollment_total
+    track_seats(course.enrolled_students, -1)
+    course.enrolled_students += delta
+    track_seats(course.enrolled_students, 1)
+    _record_versions["courses"] += 1
+    _enrollment_total += delta
+
+def get_enrollment_extrema() -> Tuple[int, int]:
+    # Distinct seat counts are bounded by max_capacity, not by the number of courses
+    return (min(_seat_counts), max(_seat_counts)) if _seat_counts else (0, 0)
+
+def check_email_available(email: str, owner: Optional[Tuple[str, int]] = None):
+    existing = _email_index.get(email.lower())
+    if existing is not None and existing != owner:
+        raise Conflict(detail=f"Email '{email}' is already in use.", error_code="EMAIL_ALREADY_EXISTS")
+
+def reserve_email(email: str, owner: Tuple[str, int]):
+    check_email_available(email, owner)
+    _email_index[email.lower()] = owner
+
+def release_email(email: Optional[str]):
+    if email is not None:
+        _email_index.pop(email.lower(), None)
+
+def change_email(old_email: Optional[str], new_email: Optional[str], owner: Tuple[str, int]):
+    """Reserves new_email for owner and frees old_email; a None new_email just frees the old address."""
+    if new_email is not None:
+        reserve_email(new_email, owner)
+    if old_email is not None and (new_email is None or new_email.lower() != old_email.lower()):
+        release_email(old_email)
+
+def index_enrollment(enrollment: Enrollment):
+    _enr_by_student.setdefault(enrollment.student_id, {})[enrollment.id] = None
+    _enr_by_course.setdefault(enrollment.course_id, {})[enrollment.id] = None
+    _enr_by_pair[(enrollment.student_id, enrollment.course_id)] = enrollment.id
+
+def remove_enrollment(enrollment_id: str) -> Enrollment:
+    enrollment = db["enrollments"].pop(enrollment_id)
+    _enr_by_student.get(enrollment.student_id, {}).pop(enrollment_id, None)
+    _enr_by_course.get(enrollment.course_id, {}).pop(enrollment_id, None)
+    _enr_by_pair.pop((enrollment.student_id, enrollment.course_id), None)
+    return enrollment
 
-def check_unique_email(email: str, current_id: Optional[int] = None):
-    for p in db["professors"].values():
-        if p.email == email and p.id != current_id:
-            raise Conflict(detail=f"Email '{email}' is already in use.", error_code="EMAIL_ALREADY_EXISTS")
-    for s in db["students"].values():
-        if s.email == email and s.id != current_id:
-            raise Conflict(detail=f"Email '{email}' is already in use.", error_code="EMAIL_ALREADY_EXISTS")
+def add_to_index(index: Dict[str, Dict[int, None]], value: Optional[str], item_id: int):
+    if value is None: return
+    key = value.casefold()
+    ids = index[key]
+    if ids and item_id < next(reversed(ids)):
+        # An update moved an older record into this bucket; re-sort so the bucket stays in id order
+        ids[item_id] = None
+        index[key] = dict.fromkeys(sorted(ids))
+    else:
+        ids[item_id] = None
+
+def remove_from_index(index: Dict[str, Dict[int, None]], value: Optional[str], item_id: int):
+    if value is None: return
+    key = value.casefold()
+    ids = index.get(key)
+    if ids is not None:
+        ids.pop(item_id, None)
+        if not ids: del index[key]
+
+def move_in_index(index: Dict[str, Dict[int, None]], old_value: Optional[str], new_value: Optional[str], item_id: int):
+    if old_value is not None and new_value is not None and old_value.casefold() == new_value.casefold(): return
+    remove_from_index(index, old_value, item_id)
+    add_to_index(index, new_value, item_id)
+
+@functools.lru_cache(maxsize=None)
+def get_type_adapter(content_type: Any) -> TypeAdapter:
+    return TypeAdapter(content_type)
+
+def serialized(content: Any, content_type: Any, status_code: int = status.HTTP_200_OK) -> Response:
+    """Dumps trusted db records straight to JSON bytes; returning a Response skips response_model validation."""
+    return Response(get_type_adapter(content_type).dump_json(content), status_code=status_code, media_type="application/json")
+
+@functools.lru_cache(maxsize=1024)
+def cached_record_json(resource: str, record_id: int, version: int) -> bytes:
+    record = db[resource][record_id]
+    return get_type_adapter(type(record)).dump_json(record)
+
+def cached_record(resource: str, record_id: int) -> Response:
+    body = cached_record_json(resource, record_id, _record_versions[resource])
+    return Response(body, media_type="application/json")
 
 def get_enrollment_key_by_ids(student_id: int, course_id: int) -> Optional[str]:
-    for id, enrollment in db["enrollments"].items():
-        if enrollment.student_id == student_id and enrollment.course_id == course_id:
-            return id
-    return None
+    return _enr_by_pair.get((student_id, course_id))
+
+for _enrollment in db["enrollments"].values():
+    index_enrollment(_enrollment)
+for _professor in db["professors"].values():
+    add_to_index(_prof_by_dept, _professor.department, _professor.id)
+for _student in db["students"].values():
+    add_to_index(_stud_by_major, _student.major, _student.id)
+    _gpa_distribution[gpa_bucket(_student)] += 1
 
 # --- 6. API Endpoints ---
 
 @app.get("/", tags=["Health Check"])
-def read_root():
+async def read_root():
     return {"message": "Welcome to the University Management API!"}
 
 # --- Professor Endpoints (Full CRUD) ---
 @app.post("/professors/", response_model=Professor, status_code=status.HTTP_201_CREATED, tags=["Professors"])
-def create_professor(professor_data: ProfessorCreate):
-    check_unique_email(professor_data.email)
-    global next_professor_id
-    new_professor = Professor(id=next_professor_id, **professor_data.model_dump())
-    db["professors"][next_professor_id] = new_professor
-    next_professor_id += 1
-    return new_professor
+async def create_professor(professor_data: ProfessorCreate):
+    # Check before drawing an id, so a rejected duplicate doesn't use one up
+    check_email_available(professor_data.email)
+    professor_id = next(_professor_ids)
+    reserve_email(professor_data.email, ("professor", professor_id))
+    new_professor = Professor.model_construct(id=professor_id, **professor_data.__dict__)
+    db["professors"][professor_id] = new_professor
+    add_to_index(_prof_by_dept, new_professor.department, new_professor.id)
+    return serialized(new_professor, Professor, status.HTTP_201_CREATED)
 
 @app.get("/professors/", response_model=List[Professor], tags=["Professors"])
-def get_all_professors(department: Optional[str] = None, page: int = Query(1, ge=1), size: int = Query(10, ge=1, le=100)):
-    professors = list(db["professors"].values())
+async def get_all_professors(department: Optional[str] = None, page: int = Query(1, ge=1), size: int = Query(10, ge=1, le=100)):
+    professors = db["professors"].values()
     if department:
-        professors = [p for p in professors if p.department.lower() == department.lower()]
+        professors = (db["professors"][pid] for pid in _prof_by_dept.get(department.casefold(), ()))
     start = (page - 1) * size
-    return professors[start:start + size]
+    return serialized(list(itertools.islice(professors, start, start + size)), List[Professor])
 
 @app.get("/professors/{professor_id}", response_model=Professor, tags=["Professors"])
-def get_professor(professor_id: int):
+async def get_professor(professor_id: int):
     professor = db["professors"].get(professor_id)
     if not professor:
         raise NotFound("Professor", professor_id)
-    return professor
+    return cached_record("professors", professor_id)
 
 @app.put("/professors/{professor_id}", response_model=Professor, tags=["Professors"])
-def update_professor(professor_id: int, professor_update: ProfessorUpdate):
+async def update_professor(professor_id: int, professor_update: ProfessorUpdate):
     professor = db["professors"].get(professor_id)
     if not professor:
         raise NotFound("Professor", professor_id)
-    if professor_update.email:
-        check_unique_email(professor_update.email, current_id=professor_id)
     update_data = professor_update.model_dump(exclude_unset=True)
+    if "email" in update_data:
+        change_email(professor.email, update_data["email"], ("professor", professor_id))
+    if "department" in update_data:
+        move_in_index(_prof_by_dept, professor.department, update_data["department"], professor_id)
     for key, value in update_data.items():
         setattr(professor, key, value)
-    return professor
+    _record_versions["professors"] += 1
+    return serialized(professor, Professor)
 
 @app.delete("/professors/{professor_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Professors"])
-def delete_professor(professor_id: int):
+async def delete_professor(professor_id: int):
     if professor_id not in db["professors"]:
         raise NotFound("Professor", professor_id)
     assigned_courses = [c.id for c in db["courses"].values() if c.professor_id == professor_id]
@@ -287,113 +484,133 @@ def delete_professor(professor_id: int):
             error_code="PROFESSOR_HAS_COURSES",
             assigned_courses=assigned_courses
         )
-    del db["professors"][professor_id]
+    professor = db["professors"].pop(professor_id)
+    remove_from_index(_prof_by_dept, professor.department, professor_id)
+    release_email(professor.email)
     return
 
 # --- Student Endpoints (Full CRUD) ---
 @app.post("/students/", response_model=Student, status_code=status.HTTP_201_CREATED, tags=["Students"])
-def create_student(student_data: StudentCreate):
-    check_unique_email(student_data.email)
-    global next_student_id
-    new_student = Student(id=next_student_id, **student_data.model_dump())
-    db["students"][next_student_id] = new_student
-    next_student_id += 1
-    return new_student
+async def create_student(student_data: StudentCreate):
+    check_email_available(student_data.email)
+    student_id = next(_student_ids)
+    reserve_email(student_data.email, ("student", student_id))
+    new_student = Student.model_construct(id=student_id, **student_data.__dict__)
+    db["students"][student_id] = new_student
+    add_to_index(_stud_by_major, new_student.major, new_student.id)
+    _gpa_distribution[gpa_bucket(new_student)] += 1
+    return serialized(new_student, Student, status.HTTP_201_CREATED)
 
 @app.get("/students/", response_model=List[Student], tags=["Students"])
-def get_all_students(major: Optional[str] = None, year: Optional[int] = None, page: int = Query(1, ge=1), size: int = Query(10, ge=1, le=100)):
-    students = list(db["students"].values())
-    if major: students = [s for s in students if s.major.lower() == major.lower()]
-    if year: students = [s for s in students if s.year == year]
+async def get_all_students(major: Optional[str] = None, year: Optional[int] = None, page: int = Query(1, ge=1), size: int = Query(10, ge=1, le=100)):
+    students = db["students"].values()
+    if major:
+        students = (db["students"][sid] for sid in _stud_by_major.get(major.casefold(), ()))
+    if year: students = (s for s in students if s.year == year)
     start = (page - 1) * size
-    return students[start:start + size]
+    return serialized(list(itertools.islice(students, start, start + size)), List[Student])
 
 @app.get("/students/{student_id}", response_model=Student, tags=["Students"])
-def get_student(student_id: int):
+async def get_student(student_id: int):
     student = db["students"].get(student_id)
     if not student:
         raise NotFound("Student", student_id)
-    return student
+    return cached_record("students", student_id)
 
 @app.put("/students/{student_id}", response_model=Student, tags=["Students"])
-def update_student(student_id: int, student_update: StudentUpdate):
+async def update_student(student_id: int, student_update: StudentUpdate):
     student = db["students"].get(student_id)
     if not student:
         raise NotFound("Student", student_id)
-    if student_update.email:
-        check_unique_email(student_update.email, current_id=student_id)
     update_data = student_update.model_dump(exclude_unset=True)
+    if "email" in update_data:
+        change_email(student.email, update_data["email"], ("student", student_id))
+    if "major" in update_data:
+        move_in_index(_stud_by_major, student.major, update_data["major"], student_id)
     for key, value in update_data.items():
         setattr(student, key, value)
-    return student
+    _record_versions["students"] += 1
+    return serialized(student, Student)
 
 @app.delete("/students/{student_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Students"])
-def delete_student(student_id: int):
+async def delete_student(student_id: int):
     if student_id not in db["students"]:
         raise NotFound("Student", student_id)
-    enrollments_to_delete = [eid for eid, e in db["enrollments"].items() if e.student_id == student_id]
-    for eid in enrollments_to_delete:
-        course_id = db["enrollments"][eid].course_id
+    for eid in _enr_by_student.pop(student_id, {}):
+        course_id = remove_enrollment(eid).course_id
         if course_id in db["courses"]:
-            db["courses"][course_id].enrolled_students -= 1
-        del db["enrollments"][eid]
-    del db["students"][student_id]
+            adjust_enrolled_students(db["courses"][course_id], -1)
+    student = db["students"].pop(student_id)
+    remove_from_index(_stud_by_major, student.major, student_id)
+    _gpa_distribution[gpa_bucket(student)] -= 1
+    release_email(student.email)
     return
 
 # --- Course Endpoints (Full CRUD) ---
 @app.post("/courses/", response_model=Course, status_code=status.HTTP_201_CREATED, tags=["Courses"])
-def create_course(course_data: CourseCreate):
+async def create_course(course_data: CourseCreate):
     if course_data.professor_id not in db["professors"]:
         raise NotFound("Professor", course_data.professor_id)
-    global next_course_id
-    new_course = Course(id=next_course_id, **course_data.model_dump())
-    db["courses"][next_course_id] = new_course
-    next_course_id += 1
-    return new_course
+    course_id = next(_course_ids)
+    new_course = Course.model_construct(id=course_id, **course_data.__dict__)
+    db["courses"][course_id] = new_course
+    track_seats(new_course.enrolled_students, 1)
+    return serialized(new_course, Course, status.HTTP_201_CREATED)
 
 @app.get("/courses/", response_model=List[Course], tags=["Courses"])
-def get_all_courses(department: Optional[str] = None, credits: Optional[int] = None, page: int = Query(1, ge=1), size: int = Query(10, ge=1, le=100)):
-    courses = list(db["courses"].values())
+async def get_all_courses(department: Optional[str] = None, credits: Optional[int] = None, page: int = Query(1, ge=1), size: int = Query(10, ge=1, le=100)):
+    courses = db["courses"].values()
     if department:
-        prof_depts = {p.id: p.department for p in db["professors"].values()}
-        courses = [c for c in courses if prof_depts.get(c.professor_id, '').lower() == department.lower()]
+        dept_professors = _prof_by_dept.get(department.casefold(), {})
+        courses = (c for c in courses if c.professor_id in dept_professors)
     if credits:
-        courses = [c for c in courses if c.credits == credits]
+        courses = (c for c in courses if c.credits == credits)
     start = (page - 1) * size
-    return courses[start:start + size]
+    return serialized(list(itertools.islice(courses, start, start + size)), List[Course])
 
 @app.get("/courses/{course_id}", response_model=Course, tags=["Courses"])
-def get_course(course_id: int):
+async def get_course(course_id: int):
     course = db["courses"].get(course_id)
     if not course:
         raise NotFound("Course", course_id)
-    return course
+    return cached_record("courses", course_id)
 
 @app.put("/courses/{course_id}", response_model=Course, tags=["Courses"])
-def update_course(course_id: int, course_update: CourseUpdate):
+async def update_course(course_id: int, course_update: CourseUpdate):
     course = db["courses"].get(course_id)
     if not course:
         raise NotFound("Course", course_id)
     update_data = course_update.model_dump(exclude_unset=True)
     if "professor_id" in update_data and update_data["professor_id"] not in db["professors"]:
         raise NotFound("Professor", update_data["professor_id"])
+    old_credits = course.credits
     for key, value in update_data.items():
         setattr(course, key, value)
-    return course
+    _record_versions["courses"] += 1
+    if course.credits != old_credits:
+        for eid in _enr_by_course.get(course_id, ()):
+            enrollment = db["enrollments"][eid]
+            if enrollment.grade is not None:
+                apply_grade_change(enrollment.student_id, enrollment.grade, enrollment.grade, old_credits, course.credits)
+    return serialized(course, Course)
 
 @app.delete("/courses/{course_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Courses"])
-def delete_course(course_id: int):
+async def delete_course(course_id: int):
     if course_id not in db["courses"]:
         raise NotFound("Course", course_id)
-    enrollments_to_delete = [eid for eid, e in db["enrollments"].items() if e.course_id == course_id]
-    for eid in enrollments_to_delete:
-        del db["enrollments"][eid]
-    del db["courses"][course_id]
+    global _enrollment_total
+    course = db["courses"].pop(course_id)
+    _enrollment_total -= course.enrolled_students
+    track_seats(course.enrolled_students, -1)
+    for eid in _enr_by_course.pop(course_id, {}):
+        enrollment = remove_enrollment(eid)
+        if enrollment.grade is not None:
+            apply_grade_change(enrollment.student_id, enrollment.grade, None, course.credits)
     return
 
 # --- Enrollment Endpoints ---
 @app.post("/enrollments/", response_model=EnrollmentSuccessResponse, status_code=status.HTTP_201_CREATED, tags=["Enrollments"])
-def enroll_student_in_course(enrollment_data: EnrollmentCreate):
+async def enroll_student_in_course(enrollment_data: EnrollmentCreate):
     student = db["students"].get(enrollment_data.student_id)
     if not student: raise NotFound("Student", enrollment_data.student_id)
     course = db["courses"].get(enrollment_data.course_id)
@@ -403,76 +620,72 @@ def enroll_student_in_course(enrollment_data: EnrollmentCreate):
                        current_enrollment=course.enrolled_students, max_capacity=course.max_capacity)
     if get_enrollment_key_by_ids(student.id, course.id):
         raise Conflict("Student is already enrolled in this course", "DUPLICATE_ENROLLMENT")
-    global next_enrollment_id
-    enrollment_id = f"ENR{next_enrollment_id}"
-    new_enrollment = Enrollment(id=enrollment_id, **enrollment_data.model_dump())
+    enrollment_id = f"ENR{next(_enrollment_ids)}"
+    new_enrollment = Enrollment.model_construct(id=enrollment_id, **enrollment_data.__dict__)
     db["enrollments"][enrollment_id] = new_enrollment
-    course.enrolled_students += 1
-    next_enrollment_id += 1
-    return EnrollmentSuccessResponse(enrollment_id=enrollment_id, student=student, course=course, enrollment_date=new_enrollment.enrollment_date)
+    index_enrollment(new_enrollment)
+    adjust_enrolled_students(course, 1)
+    response = EnrollmentSuccessResponse.model_construct(enrollment_id=enrollment_id, student=student, course=course, enrollment_date=new_enrollment.enrollment_date)
+    return serialized(response, EnrollmentSuccessResponse, status.HTTP_201_CREATED)
 
 @app.get("/enrollments/", response_model=List[Enrollment], tags=["Enrollments"])
-def get_all_enrollments():
-    return list(db["enrollments"].values())
+async def get_all_enrollments():
+    return serialized(list(db["enrollments"].values()), List[Enrollment])
 
 @app.put("/enrollments/{student_id}/{course_id}/grade", response_model=Enrollment, tags=["Enrollments"])
-def update_enrollment_grade(student_id: int, course_id: int, grade: str = Query(..., regex="^[A-DF]$")):
+async def update_enrollment_grade(student_id: int, course_id: int, grade: Grade = Query(...)):
     enrollment_id = get_enrollment_key_by_ids(student_id, course_id)
     if not enrollment_id:
         raise NotFound("Enrollment", f"student_id: {student_id}, course_id: {course_id}")
     enrollment = db["enrollments"][enrollment_id]
-    enrollment.grade = grade.upper()
-    calculate_gpa(student_id)
-    return enrollment
+    old_grade, enrollment.grade = enrollment.grade, grade
+    apply_grade_change(student_id, old_grade, grade, db["courses"][course_id].credits)
+    return serialized(enrollment, Enrollment)
 
 @app.delete("/enrollments/{student_id}/{course_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Enrollments"])
-def drop_course(student_id: int, course_id: int):
+async def drop_course(student_id: int, course_id: int):
     enrollment_id = get_enrollment_key_by_ids(student_id, course_id)
     if not enrollment_id:
         raise NotFound("Enrollment", f"student_id: {student_id}, course_id: {course_id}")
-    if course_id in db["courses"]:
-        db["courses"][course_id].enrolled_students -= 1
-    del db["enrollments"][enrollment_id]
-    calculate_gpa(student_id)
+    course = db["courses"][course_id]
+    adjust_enrolled_students(course, -1)
+    apply_grade_change(student_id, remove_enrollment(enrollment_id).grade, None, course.credits)
     return
 
 # --- Complex Query & Analytics Endpoints ---
 @app.get("/students/{student_id}/courses", response_model=List[Course], tags=["Students"])
-def get_student_courses(student_id: int):
+async def get_student_courses(student_id: int):
     if student_id not in db["students"]: raise NotFound("Student", student_id)
-    enrolled_course_ids = [e.course_id for e in db["enrollments"].values() if e.student_id == student_id]
-    return [db["courses"][cid] for cid in enrolled_course_ids if cid in db["courses"]]
+    enrolled_course_ids = [db["enrollments"][eid].course_id for eid in _enr_by_student.get(student_id, ())]
+    return serialized([db["courses"][cid] for cid in enrolled_course_ids if cid in db["courses"]], List[Course])
 
 @app.get("/courses/{course_id}/students", response_model=List[Student], tags=["Courses"])
-def get_course_roster(course_id: int):
+async def get_course_roster(course_id: int):
     if course_id not in db["courses"]: raise NotFound("Course", course_id)
-    enrolled_student_ids = [e.student_id for e in db["enrollments"].values() if e.course_id == course_id]
-    return [db["students"][sid] for sid in enrolled_student_ids if sid in db["students"]]
+    enrolled_student_ids = [db["enrollments"][eid].student_id for eid in _enr_by_course.get(course_id, ())]
+    return serialized([db["students"][sid] for sid in enrolled_student_ids if sid in db["students"]], List[Student])
 
 @app.get("/professors/{professor_id}/courses", response_model=List[Course], tags=["Professors"])
-def get_professor_teaching_schedule(professor_id: int):
+async def get_professor_teaching_schedule(professor_id: int):
     if professor_id not in db["professors"]: raise NotFound("Professor", professor_id)
-    return [c for c in db["courses"].values() if c.professor_id == professor_id]
+    return serialized([c for c in db["courses"].values() if c.professor_id == professor_id], List[Course])
 
 @app.get("/analytics/students/gpa-distribution", tags=["Analytics"])
-def get_gpa_distribution():
-    distribution = {"0.0-0.99": 0, "1.0-1.99": 0, "2.0-2.99": 0, "3.0-4.0": 0, "Not Graded": 0}
-    for s in db["students"].values():
-        if s.gpa == 0 and not any(e.grade for e in db["enrollments"].values() if e.student_id == s.id):
-            distribution["Not Graded"] += 1
-        elif 0.0 <= s.gpa < 1.0: distribution["0.0-0.99"] += 1
-        elif 1.0 <= s.gpa < 2.0: distribution["1.0-1.99"] += 1
-        elif 2.0 <= s.gpa < 3.0: distribution["2.0-2.99"] += 1
-        elif 3.0 <= s.gpa <= 4.0: distribution["3.0-4.0"] += 1
-    return distribution
+async def get_gpa_distribution():
+    return dict(_gpa_distribution)
 
 @app.get("/analytics/courses/enrollment-stats", tags=["Analytics"])
-def get_course_enrollment_stats():
+async def get_course_enrollment_stats():
     if not db["courses"]: return {"message": "No courses available."}
-    enrollments = [c.enrolled_students for c in db["courses"].values()]
-    count = len(enrollments)
-    total = sum(enrollments)
+    count = len(db["courses"])
+    total = _enrollment_total
+    min_enrollment, max_enrollment = get_enrollment_extrema()
     return {"total_courses": count, "total_enrollment": total,
             "average_enrollment_per_course": round(total / count, 2) if count > 0 else 0,
-            "min_enrollment": min(enrollments) if enrollments else 0,
-            "max_enrollment": max(enrollments) if enrollments else 0}
\ No newline at end of file
+            "min_enrollment": min_enrollment,
+            "max_enrollment": max_enrollment}
+
+if __name__ == "__main__":
+    import uvicorn
+    # The database lives in process memory, so this runs a single worker.
+    uvicorn.run("main:app", loop="asyncio" if sys.platform == "win32" else "uvloop", http="httptools", access_log=False)
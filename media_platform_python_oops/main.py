@@ -1,16 +1,30 @@
 # media_streaming_platform.py
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any
+from collections import Counter, namedtuple
+from types import MappingProxyType
+from typing import List, Dict, Iterable, Optional, Any, Tuple
 import random
 
+# Streaming cost discount per subscription tier (Free pays the base cost)
+TIER_MULTIPLIERS = {"Premium": 0.5, "Family": 0.7}
+
 # --- Abstract Base Classes ---
 
 class MediaContent(ABC):
+    # Subclasses declare their own fields as __slots__ too, so no instance carries a __dict__
+    __slots__ = ("title", "premium", "_ratings", "_rating_sum", "_file_size", "_base_cost")
+
+    # Only some content types define these; the defaults keep lookups plain attribute access
+    genre: Optional[str] = None
+    artist: Optional[str] = None
+
     def __init__(self, title: str, premium: bool = False):
         self.title = title
         self.premium = premium
-        self.ratings = []
+        # Ratings are only added through add_rating, which keeps the running sum in step with the list
+        self._ratings: List[int] = []
+        self._rating_sum = 0
 
     @abstractmethod
     def play(self):
@@ -30,46 +44,37 @@ class MediaContent(ABC):
 
     def add_rating(self, rating: int):
         if 1 <= rating <= 5:
-            self.ratings.append(rating)
+            self._ratings.append(rating)
+            self._rating_sum += rating
+
+    @property
+    def ratings(self) -> Tuple[int, ...]:
+        return tuple(self._ratings)
+
+    def get_rating_count(self) -> int:
+        return len(self._ratings)
 
     def get_average_rating(self) -> float:
-        return sum(self.ratings) / len(self.ratings) if self.ratings else 0.0
+        return self._rating_sum / len(self._ratings) if self._ratings else 0.0
 
     def is_premium_content(self) -> bool:
         return self.premium
 
-class StreamingDevice(ABC):
-    def __init__(self, device_name: str):
-        self.device_name = device_name
-
-    @abstractmethod
-    def connect(self):
-        pass
-
-    @abstractmethod
-    def stream_content(self, content: MediaContent):
-        pass
-
-    @abstractmethod
-    def adjust_quality(self, quality: str):
-        pass
-
-    def get_device_info(self) -> str:
-        return f"Device: {self.device_name}"
-
-    def check_compatibility(self, content: MediaContent) -> bool:
-        # For simplicity, all devices are compatible with all content
-        return True
-
 # --- Concrete Media Content Types ---
 
 class Movie(MediaContent):
+    __slots__ = ("duration", "resolution", "genre", "director")
+
     def __init__(self, title, duration, resolution, genre, director, premium=False):
         super().__init__(title, premium)
         self.duration = duration  # in minutes
         self.resolution = resolution
         self.genre = genre
         self.director = director
+        # Assume 1GB per hour at 1080p, 2GB per hour at 4K
+        size_per_hour = 2 if resolution == "4K" else 1
+        self._file_size = (duration / 60) * size_per_hour
+        self._base_cost = 5.0 if premium else 2.0
 
     def play(self):
         print(f"Playing movie: {self.title} ({self.resolution})")
@@ -78,24 +83,22 @@ class Movie(MediaContent):
         return self.duration
 
     def get_file_size(self):
-        # Assume 1GB per hour at 1080p, 2GB per hour at 4K
-        size_per_hour = 2 if self.resolution == "4K" else 1
-        return (self.duration / 60) * size_per_hour
+        return self._file_size
 
     def calculate_streaming_cost(self, subscription_tier):
-        base_cost = 5.0 if self.premium else 2.0
-        if subscription_tier == "Premium":
-            return base_cost * 0.5
-        elif subscription_tier == "Family":
-            return base_cost * 0.7
-        return base_cost
+        return self._base_cost * TIER_MULTIPLIERS.get(subscription_tier, 1.0)
 
 class TVShow(MediaContent):
+    __slots__ = ("episodes", "seasons", "current_episode")
+
     def __init__(self, title, episodes, seasons, current_episode, premium=False):
         super().__init__(title, premium)
         self.episodes = episodes
         self.seasons = seasons
         self.current_episode = current_episode
+        # Assume 500MB per episode
+        self._file_size = 0.5
+        self._base_cost = 1.0 if premium else 0.5
 
     def play(self):
         print(f"Playing TV Show: {self.title} - S{self.seasons}E{self.current_episode}")
@@ -105,23 +108,22 @@ class TVShow(MediaContent):
         return 45
 
     def get_file_size(self):
-        # Assume 500MB per episode
-        return 0.5
+        return self._file_size
 
     def calculate_streaming_cost(self, subscription_tier):
-        base_cost = 1.0 if self.premium else 0.5
-        if subscription_tier == "Premium":
-            return base_cost * 0.5
-        elif subscription_tier == "Family":
-            return base_cost * 0.7
-        return base_cost
+        return self._base_cost * TIER_MULTIPLIERS.get(subscription_tier, 1.0)
 
 class Podcast(MediaContent):
+    __slots__ = ("episode_number", "transcript_available", "duration")
+
     def __init__(self, title, episode_number, transcript_available, duration, premium=False):
         super().__init__(title, premium)
         self.episode_number = episode_number
         self.transcript_available = transcript_available
         self.duration = duration
+        # Assume 50MB per 30 minutes
+        self._file_size = (duration / 30) * 0.05
+        self._base_cost = 0.5 if premium else 0.2
 
     def play(self):
         print(f"Playing Podcast: {self.title} - Episode {self.episode_number}")
@@ -130,24 +132,23 @@ class Podcast(MediaContent):
         return self.duration
 
     def get_file_size(self):
-        # Assume 50MB per 30 minutes
-        return (self.duration / 30) * 0.05
+        return self._file_size
 
     def calculate_streaming_cost(self, subscription_tier):
-        base_cost = 0.5 if self.premium else 0.2
-        if subscription_tier == "Premium":
-            return base_cost * 0.5
-        elif subscription_tier == "Family":
-            return base_cost * 0.7
-        return base_cost
+        return self._base_cost * TIER_MULTIPLIERS.get(subscription_tier, 1.0)
 
 class Music(MediaContent):
+    __slots__ = ("artist", "album", "lyrics_available", "duration")
+
     def __init__(self, title, artist, album, lyrics_available, duration, premium=False):
         super().__init__(title, premium)
         self.artist = artist
         self.album = album
         self.lyrics_available = lyrics_available
         self.duration = duration
+        # Assume 10MB per 5 minutes
+        self._file_size = (duration / 5) * 0.01
+        self._base_cost = 0.3 if premium else 0.1
 
     def play(self):
         print(f"Playing Music: {self.title} by {self.artist}")
@@ -156,142 +157,210 @@ class Music(MediaContent):
         return self.duration
 
     def get_file_size(self):
-        # Assume 10MB per 5 minutes
-        return (self.duration / 5) * 0.01
+        return self._file_size
 
     def calculate_streaming_cost(self, subscription_tier):
-        base_cost = 0.3 if self.premium else 0.1
-        if subscription_tier == "Premium":
-            return base_cost * 0.5
-        elif subscription_tier == "Family":
-            return base_cost * 0.7
-        return base_cost
-
-# --- Concrete Streaming Devices ---
-
-class SmartTV(StreamingDevice):
-    def __init__(self):
-        super().__init__("SmartTV")
-        self.screen_size = "Large"
-        self.resolution = "4K"
-        self.surround_sound = True
+        return self._base_cost * TIER_MULTIPLIERS.get(subscription_tier, 1.0)
+
+# --- Streaming Devices ---
+
+# A device is fully described by its messages and hardware traits, so one class serves every profile.
+# Message templates are formatted with the device's traits, plus title / quality.
+DeviceProfile = namedtuple("DeviceProfile", "name connect_msg stream_fmt quality_fmt traits")
+
+def device_profile(name: str, connect_msg: str, stream_fmt: str, quality_fmt: str, **traits: Any) -> DeviceProfile:
+    # Profiles are shared by every device built from them, so their traits are read-only
+    return DeviceProfile(name, connect_msg, stream_fmt, quality_fmt, MappingProxyType(traits))
+
+SMART_TV = device_profile("SmartTV", "SmartTV connected to WiFi.",
+                          "Streaming '{title}' on SmartTV in {resolution} with surround sound.",
+                          "SmartTV quality set to {quality}.",
+                          screen_size="Large", resolution="4K", surround_sound=True)
+LAPTOP = device_profile("Laptop", "Laptop connected to WiFi.",
+                        "Streaming '{title}' on Laptop with headphones.",
+                        "Laptop quality set to {quality}.",
+                        screen_size="Medium", headphone_support=True)
+MOBILE = device_profile("Mobile", "Mobile connected to cellular network.",
+                        "Streaming '{title}' on Mobile with battery optimization.",
+                        "Mobile quality set to {quality}.",
+                        screen_size="Small", battery_optimization=True)
+SMART_SPEAKER = device_profile("SmartSpeaker", "SmartSpeaker connected to WiFi.",
+                               "Streaming '{title}' on SmartSpeaker (audio only).",
+                               "SmartSpeaker audio quality set to {quality}.",
+                               audio_only=True, voice_control=True)
+
+class StreamingDevice:
+    # Trait values live in a per-instance copy of the profile's traits, exposed as attributes
+    __slots__ = ("device_name", "profile", "traits")
+
+    def __init__(self, profile: DeviceProfile):
+        self.device_name = profile.name
+        self.profile = profile
+        self.traits: Dict[str, Any] = dict(profile.traits)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for names that aren't slots, i.e. trait lookups like tv.resolution
+        try:
+            return object.__getattribute__(self, "traits")[name]
+        except (AttributeError, KeyError):
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}") from None
+
+    def __setattr__(self, name: str, value: Any):
+        if name not in StreamingDevice.__slots__ and name in self.traits:
+            self.traits[name] = value
+        else:
+            object.__setattr__(self, name, value)
 
     def connect(self):
-        print("SmartTV connected to WiFi.")
+        print(self.profile.connect_msg)
 
     def stream_content(self, content: MediaContent):
-        print(f"Streaming '{content.title}' on SmartTV in {self.resolution} with surround sound.")
+        print(self.profile.stream_fmt.format(title=content.title, **self.traits))
 
     def adjust_quality(self, quality: str):
-        print(f"SmartTV quality set to {quality}.")
+        print(self.profile.quality_fmt.format(quality=quality, **self.traits))
 
-class Laptop(StreamingDevice):
-    def __init__(self):
-        super().__init__("Laptop")
-        self.screen_size = "Medium"
-        self.headphone_support = True
-
-    def connect(self):
-        print("Laptop connected to WiFi.")
+    def get_device_info(self) -> str:
+        return f"Device: {self.device_name}"
 
-    def stream_content(self, content: MediaContent):
-        print(f"Streaming '{content.title}' on Laptop with headphones.")
+    def check_compatibility(self, content: MediaContent) -> bool:
+        # For simplicity, all devices are compatible with all content
+        return True
 
-    def adjust_quality(self, quality: str):
-        print(f"Laptop quality set to {quality}.")
+# The original device types, kept as thin subclasses so isinstance checks and subclassing still work
+class SmartTV(StreamingDevice):
+    __slots__ = ()
 
-class Mobile(StreamingDevice):
     def __init__(self):
-        super().__init__("Mobile")
-        self.screen_size = "Small"
-        self.battery_optimization = True
+        super().__init__(SMART_TV)
 
-    def connect(self):
-        print("Mobile connected to cellular network.")
+class Laptop(StreamingDevice):
+    __slots__ = ()
 
-    def stream_content(self, content: MediaContent):
-        print(f"Streaming '{content.title}' on Mobile with battery optimization.")
+    def __init__(self):
+        super().__init__(LAPTOP)
 
-    def adjust_quality(self, quality: str):
-        print(f"Mobile quality set to {quality}.")
+class Mobile(StreamingDevice):
+    __slots__ = ()
 
-class SmartSpeaker(StreamingDevice):
     def __init__(self):
-        super().__init__("SmartSpeaker")
-        self.audio_only = True
-        self.voice_control = True
-
-    def connect(self):
-        print("SmartSpeaker connected to WiFi.")
+        super().__init__(MOBILE)
 
-    def stream_content(self, content: MediaContent):
-        print(f"Streaming '{content.title}' on SmartSpeaker (audio only).")
+class SmartSpeaker(StreamingDevice):
+    __slots__ = ()
 
-    def adjust_quality(self, quality: str):
-        print(f"SmartSpeaker audio quality set to {quality}.")
+    def __init__(self):
+        super().__init__(SMART_SPEAKER)
 
 # --- User and Platform Classes ---
 
+def random_recommendations(all_content: List[MediaContent], k: int = 3) -> List[MediaContent]:
+    # For a handful of picks, rejection-sampling distinct indices is cheaper than random.sample
+    n = len(all_content)
+    if n <= k:
+        return random.sample(all_content, n)
+    picks = []  # a list, so the picks keep their random draw order
+    while len(picks) < k:
+        i = random.randrange(n)
+        if i not in picks:
+            picks.append(i)
+    return [all_content[i] for i in picks]
+
+def match_preferences(preferences: Dict[str, Any], candidates: Iterable[MediaContent]) -> List[MediaContent]:
+    # Simple recommendation: match genre or artist/album, keeping the candidates' order
+    pref_genre = preferences.get("genre")
+    pref_artist = preferences.get("artist")
+    return [c for c in candidates
+            if (pref_genre and c.genre == pref_genre) or (pref_artist and c.artist == pref_artist)]
+
 class User:
+    __slots__ = ("username", "subscription_tier", "watch_history", "preferences", "parental_control", "analytics",
+                 "_pref_version", "_rec_cache")
+
     def __init__(self, username: str, subscription_tier: str = "Free", parental_control: bool = False):
         self.username = username
         self.subscription_tier = subscription_tier  # Free, Premium, Family
         self.watch_history: List[MediaContent] = []
         self.preferences: Dict[str, Any] = {}
         self.parental_control = parental_control
-        self.analytics: Dict[str, int] = {}  # title -> watch time in minutes
+        self.analytics: Counter = Counter()  # title -> watch time in minutes
+        self._pref_version = 0  # bumped by set_preference
+        # (pref_version, content_version, recs) from the platform's last recommendation pass
+        self._rec_cache: Tuple[int, int, Tuple[MediaContent, ...]] = (-1, -1, ())
 
     def watch(self, content: MediaContent, device: StreamingDevice):
-        if self.parental_control and getattr(content, "genre", "") == "Adult":
+        if self.parental_control and content.genre == "Adult":
             print("Parental control enabled. Cannot play this content.")
             return
         device.connect()
         device.stream_content(content)
         content.play()
         self.watch_history.append(content)
-        self.analytics[content.title] = self.analytics.get(content.title, 0) + content.get_duration()
+        self.analytics[content.title] += content.get_duration()
 
     def set_preference(self, key: str, value: Any):
         self.preferences[key] = value
+        self._pref_version += 1
 
     def get_recommendations(self, all_content: List[MediaContent]) -> List[MediaContent]:
-        # Simple recommendation: match genre or artist/album
-        recs = []
-        pref_genre = self.preferences.get("genre")
-        pref_artist = self.preferences.get("artist")
-        for c in all_content:
-            if pref_genre and hasattr(c, "genre") and c.genre == pref_genre:
-                recs.append(c)
-            elif pref_artist and hasattr(c, "artist") and c.artist == pref_artist:
-                recs.append(c)
+        recs = match_preferences(self.preferences, all_content)
         # Fallback: random
         if not recs:
-            recs = random.sample(all_content, min(3, len(all_content)))
+            recs = random_recommendations(all_content)
         return recs
 
-    def get_analytics(self):
-        return self.analytics
+    def get_analytics(self) -> Dict[str, int]:
+        return dict(self.analytics)
 
 class StreamingPlatform:
     def __init__(self):
         self.users: Dict[str, User] = {}
         self.content: List[MediaContent] = []
         self.devices: List[StreamingDevice] = []
+        # Inverted indexes: genre / artist -> ascending positions in self.content
+        self.by_genre: Dict[str, List[int]] = {}
+        self.by_artist: Dict[str, List[int]] = {}
+        self.non_adult: List[MediaContent] = []
+        self._content_version = 0  # bumped by add_content
+        # (content_version, catalog, non-adult catalog) as read-only tuples, rebuilt once per catalog change
+        self._catalog_views: Tuple[int, Tuple[MediaContent, ...], Tuple[MediaContent, ...]] = (-1, (), ())
 
     def add_user(self, user: User):
         self.users[user.username] = user
 
     def add_content(self, content: MediaContent):
+        position = len(self.content)
         self.content.append(content)
+        if content.genre is not None:
+            self.by_genre.setdefault(content.genre, []).append(position)
+        if content.artist is not None:
+            self.by_artist.setdefault(content.artist, []).append(position)
+        if content.genre != "Adult":
+            self.non_adult.append(content)
+        self._content_version += 1
 
     def add_device(self, device: StreamingDevice):
         self.devices.append(device)
 
     def recommend_content(self, username: str) -> List[MediaContent]:
         user = self.users.get(username)
-        if user:
-            return user.get_recommendations(self.content)
-        return []
+        if not user:
+            return []
+        pref_version, content_version, cached = user._rec_cache
+        if pref_version == user._pref_version and content_version == self._content_version:
+            return list(cached)
+        # The indexes narrow the catalog to candidate positions; match_preferences applies the same rule as User
+        pref_genre = user.preferences.get("genre")
+        pref_artist = user.preferences.get("artist")
+        positions = set(self.by_genre.get(pref_genre, ())) if pref_genre else set()
+        if pref_artist:
+            positions.update(self.by_artist.get(pref_artist, ()))
+        recs = match_preferences(user.preferences, (self.content[i] for i in sorted(positions)))
+        # Fallback: random, left uncached so repeated calls still vary
+        if not recs:
+            return random_recommendations(self.content)
+        user._rec_cache = (user._pref_version, self._content_version, tuple(recs))
+        return recs
 
     def report_watch_time(self, username: str):
         user = self.users.get(username)
@@ -299,10 +368,12 @@ class StreamingPlatform:
             return user.get_analytics()
         return {}
 
-    def filter_content(self, parental_control: bool) -> List[MediaContent]:
-        if parental_control:
-            return [c for c in self.content if getattr(c, "genre", "") != "Adult"]
-        return self.content
+    def filter_content(self, parental_control: bool) -> Tuple[MediaContent, ...]:
+        version, catalog, non_adult = self._catalog_views
+        if version != self._content_version:
+            catalog, non_adult = tuple(self.content), tuple(self.non_adult)
+            self._catalog_views = (self._content_version, catalog, non_adult)
+        return non_adult if parental_control else catalog
 
 # --- Example Usage ---
 
@@ -3,11 +3,13 @@
 # 1. pip install fastapi "uvicorn[standard]"
 # 2. uvicorn main:app --reload
 
-from fastapi import FastAPI, HTTPException, status, Query
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from __future__ import annotations
+
+from fastapi import FastAPI, HTTPException, status, Path, Query
+from fastapi.responses import Response
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter
 from datetime import date
-import copy
+from enum import Enum
 
 # --- 1. FastAPI App Initialization ---
 app = FastAPI(
@@ -45,7 +47,7 @@ class CourseCreate(CourseBase):
     professor_id: int = Field(..., example=1)
 
 class CourseUpdate(CourseBase):
-    professor_id: Optional[int] = Field(None, example=1)
+    professor_id: int | None = Field(None, example=1)
 
 class Course(CourseBase):
     id: int
@@ -68,8 +70,25 @@ class StudentUpdate(StudentBase):
 class Student(StudentBase):
     id: int
     gpa: float = Field(default=0.0, ge=0.0, le=4.0)
+    # Running totals over graded courses: sum(points * credits) and sum(credits)
+    _total_points: float = PrivateAttr(default=0.0)
+    _total_credits: int = PrivateAttr(default=0)
 
 # Enrollment Schemas
+class Grade(str, Enum):
+    A = "A"
+    B = "B"
+    C = "C"
+    D = "D"
+    F = "F"
+
+    @classmethod
+    def _missing_(cls, value):
+        # Accept lower-case grades from clients, e.g. "b" -> Grade.B
+        if isinstance(value, str):
+            return cls.__members__.get(value.upper())
+        return None
+
 class EnrollmentBase(BaseModel):
     student_id: int = Field(..., example=1)
     course_id: int = Field(..., example=1)
@@ -79,7 +98,7 @@ class EnrollmentCreate(EnrollmentBase):
 
 class Enrollment(EnrollmentBase):
     enrollment_date: date = Field(default_factory=date.today)
-    grade: Optional[str] = Field(None, example="A")
+    grade: Grade | None = Field(None, example="A")
 
 
 # --- 3. In-Memory Database ---
@@ -93,38 +112,85 @@ db = {
     "courses": {
         1: Course(id=1, name="Introduction to Cryptography", code="CS101", credits=3, max_capacity=50, professor_id=1),
     },
-    "enrollments": {}, # Key: (student_id, course_id), Value: Enrollment object
+    "enrollments": {}, # Key: _ekey(student_id, course_id), Value: Enrollment object
 }
 
+# Enrollment Indexes: student_id -> enrolled course_ids, course_id -> enrolled student_ids
+# (dicts used as ordered sets, so schedules and rosters keep enrollment order)
+enrollments_by_student: dict[int, dict[int, None]] = {}
+enrollments_by_course: dict[int, dict[int, None]] = {}
+
 # ID Counters
 next_professor_id = 2
 next_student_id = 2
 next_course_id = 2
 
 # Grade to GPA point mapping
-GRADE_TO_POINTS = {"A": 4.0, "B": 3.0, "C": 2.0, "D": 1.0, "F": 0.0}
+GRADE_TO_POINTS = {Grade.A: 4.0, Grade.B: 3.0, Grade.C: 2.0, Grade.D: 1.0, Grade.F: 0.0}
+
+# List serializers: the list endpoints dump db records straight to JSON bytes with these
+PROFESSOR_LIST = TypeAdapter(list[Professor])
+STUDENT_LIST = TypeAdapter(list[Student])
+COURSE_LIST = TypeAdapter(list[Course])
+ENROLLMENT_LIST = TypeAdapter(list[Enrollment])
 
 # --- 4. Helper Functions ---
+# Enrollment keys pack each id into a 32-bit lane, so ids taken from the URL are bounded to [0, ID_LIMIT)
+ID_LIMIT = 2**32
+
+def _ekey(student_id: int, course_id: int) -> int:
+    """Packs a (student_id, course_id) pair into one int enrollment key; both ids must be in [0, ID_LIMIT)."""
+    return (student_id << 32) | course_id
+
+def json_list_response(adapter: TypeAdapter, items: list) -> Response:
+    """Serializes trusted db records in one pass; returning a Response skips response_model re-validation."""
+    return Response(adapter.dump_json(items), media_type="application/json")
+
+def refresh_gpa(student: Student):
+    """Derives a student's GPA from their running grade point and credit totals."""
+    if student._total_credits > 0:
+        student.gpa = round(student._total_points / student._total_credits, 2)
+    else:
+        student.gpa = 0.0
+
+def apply_grade_change(student_id: int, credits: int, old_grade: str | None, new_grade: str | None):
+    """Updates a student's GPA by the contribution change of a single enrollment's grade."""
+    student = db["students"].get(student_id)
+    if not student:
+        return
+
+    if old_grade:
+        student._total_points -= GRADE_TO_POINTS[old_grade] * credits
+        student._total_credits -= credits
+    if new_grade:
+        student._total_points += GRADE_TO_POINTS[new_grade] * credits
+        student._total_credits += credits
+    refresh_gpa(student)
+
 def calculate_gpa(student_id: int):
-    """Calculates and updates a student's GPA based on their graded courses."""
-    if student_id not in db["students"]:
+    """Reseeds a student's running GPA totals from all of their graded courses."""
+    student = db["students"].get(student_id)
+    if student is None:
         return
 
+    # Grades are stored as Grade members, so every points lookup is a guaranteed hit
+    points_table = GRADE_TO_POINTS
+    enrollments = db["enrollments"]
+    courses = db["courses"]
     total_points = 0
     total_credits = 0
-    student_enrollments = [e for e in db["enrollments"].values() if e.student_id == student_id and e.grade]
-
-    for enrollment in student_enrollments:
-        course = db["courses"].get(enrollment.course_id)
-        if course and enrollment.grade in GRADE_TO_POINTS:
-            total_points += GRADE_TO_POINTS[enrollment.grade] * course.credits
-            total_credits += course.credits
+    for course_id in enrollments_by_student.get(student_id, ()):
+        enrollment = enrollments[_ekey(student_id, course_id)]
+        course = courses.get(course_id)
+        if course is None or enrollment.grade is None:
+            continue
+        credits = course.credits
+        total_points += points_table[enrollment.grade] * credits
+        total_credits += credits
     
-    student = db["students"][student_id]
-    if total_credits > 0:
-        student.gpa = round(total_points / total_credits, 2)
-    else:
-        student.gpa = 0.0
+    student._total_points = total_points
+    student._total_credits = total_credits
+    refresh_gpa(student)
 
 # --- 5. API Endpoints ---
 
@@ -136,31 +202,30 @@ def read_root():
 @app.post("/professors/", response_model=Professor, status_code=status.HTTP_201_CREATED, tags=["Professors"])
 def create_professor(professor: ProfessorCreate):
     global next_professor_id
-    new_professor = Professor(id=next_professor_id, **professor.model_dump())
+    # The body is already validated, so the stored model is built without re-validating
+    new_professor = Professor.model_construct(id=next_professor_id, **professor.__dict__)
     db["professors"][next_professor_id] = new_professor
     next_professor_id += 1
     return new_professor
 
-@app.get("/professors/", response_model=List[Professor], tags=["Professors"])
+@app.get("/professors/", response_model=list[Professor], tags=["Professors"])
 def get_all_professors():
-    return list(db["professors"].values())
+    return json_list_response(PROFESSOR_LIST, list(db["professors"].values()))
 
 @app.get("/professors/{professor_id}", response_model=Professor, tags=["Professors"])
 def get_professor(professor_id: int):
     professor = db["professors"].get(professor_id)
-    if not professor:
+    if professor is None:
         raise HTTPException(status_code=404, detail="Professor not found")
     return professor
 
 @app.put("/professors/{professor_id}", response_model=Professor, tags=["Professors"])
 def update_professor(professor_id: int, professor_update: ProfessorUpdate):
     professor = db["professors"].get(professor_id)
-    if not professor:
+    if professor is None:
         raise HTTPException(status_code=404, detail="Professor not found")
     
-    update_data = professor_update.model_dump()
-    for key, value in update_data.items():
-        setattr(professor, key, value)
+    professor.__dict__.update(professor_update.model_dump(exclude_unset=True))
     return professor
 
 @app.delete("/professors/{professor_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Professors"])
@@ -173,6 +238,7 @@ def delete_professor(professor_id: int):
         if course.professor_id == professor_id:
             raise HTTPException(status_code=400, detail=f"Cannot delete professor. Reassign courses first (e.g., Course ID: {course.id})")
             
+    # The course check must run first, so the record is only removed once nothing references it
     del db["professors"][professor_id]
     return
 
@@ -180,47 +246,42 @@ def delete_professor(professor_id: int):
 @app.post("/students/", response_model=Student, status_code=status.HTTP_201_CREATED, tags=["Students"])
 def create_student(student: StudentCreate):
     global next_student_id
-    new_student = Student(id=next_student_id, **student.model_dump())
+    new_student = Student.model_construct(id=next_student_id, **student.__dict__)
     db["students"][next_student_id] = new_student
     next_student_id += 1
     return new_student
 
-@app.get("/students/", response_model=List[Student], tags=["Students"])
+@app.get("/students/", response_model=list[Student], tags=["Students"])
 def get_all_students():
-    return list(db["students"].values())
+    return json_list_response(STUDENT_LIST, list(db["students"].values()))
 
 @app.get("/students/{student_id}", response_model=Student, tags=["Students"])
 def get_student(student_id: int):
     student = db["students"].get(student_id)
-    if not student:
+    if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
     return student
 
 @app.put("/students/{student_id}", response_model=Student, tags=["Students"])
 def update_student(student_id: int, student_update: StudentUpdate):
     student = db["students"].get(student_id)
-    if not student:
+    if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    update_data = student_update.model_dump()
-    for key, value in update_data.items():
-        setattr(student, key, value)
+    student.__dict__.update(student_update.model_dump(exclude_unset=True))
     return student
 
 @app.delete("/students/{student_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Students"])
 def delete_student(student_id: int):
-    if student_id not in db["students"]:
+    if db["students"].pop(student_id, None) is None:
         raise HTTPException(status_code=404, detail="Student not found")
     
     # Cascading delete logic: Remove all enrollments for this student
-    enrollments_to_delete = [key for key, enrollment in db["enrollments"].items() if enrollment.student_id == student_id]
-    for key in enrollments_to_delete:
-        course_id = key[1]
+    for course_id in enrollments_by_student.pop(student_id, ()):
         if course_id in db["courses"]:
             db["courses"][course_id].enrolled_students -= 1
-        del db["enrollments"][key]
-        
-    del db["students"][student_id]
+        enrollments_by_course.get(course_id, {}).pop(student_id, None)
+        del db["enrollments"][_ekey(student_id, course_id)]
     return
 
 # --- Course Endpoints (Full CRUD) ---
@@ -229,47 +290,49 @@ def create_course(course: CourseCreate):
     global next_course_id
     if course.professor_id not in db["professors"]:
         raise HTTPException(status_code=404, detail=f"Professor with id {course.professor_id} not found")
-    new_course = Course(id=next_course_id, **course.model_dump())
+    new_course = Course.model_construct(id=next_course_id, **course.__dict__)
     db["courses"][next_course_id] = new_course
     next_course_id += 1
     return new_course
 
-@app.get("/courses/", response_model=List[Course], tags=["Courses"])
+@app.get("/courses/", response_model=list[Course], tags=["Courses"])
 def get_all_courses():
-    return list(db["courses"].values())
+    return json_list_response(COURSE_LIST, list(db["courses"].values()))
 
 @app.get("/courses/{course_id}", response_model=Course, tags=["Courses"])
 def get_course(course_id: int):
     course = db["courses"].get(course_id)
-    if not course:
+    if course is None:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
 
 @app.put("/courses/{course_id}", response_model=Course, tags=["Courses"])
 def update_course(course_id: int, course_update: CourseUpdate):
     course = db["courses"].get(course_id)
-    if not course:
+    if course is None:
         raise HTTPException(status_code=404, detail="Course not found")
     
     update_data = course_update.model_dump(exclude_unset=True)
     if "professor_id" in update_data and update_data["professor_id"] not in db["professors"]:
         raise HTTPException(status_code=404, detail=f"Professor with id {update_data['professor_id']} not found")
         
-    for key, value in update_data.items():
-        setattr(course, key, value)
+    old_credits = course.credits
+    course.__dict__.update(update_data)
+    if course.credits != old_credits:
+        for student_id in enrollments_by_course.get(course_id, ()):
+            calculate_gpa(student_id)
     return course
 
 @app.delete("/courses/{course_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Courses"])
 def delete_course(course_id: int):
-    if course_id not in db["courses"]:
+    if (course := db["courses"].pop(course_id, None)) is None:
         raise HTTPException(status_code=404, detail="Course not found")
         
     # Cascading delete logic: Remove all enrollments for this course
-    enrollments_to_delete = [key for key, enrollment in db["enrollments"].items() if enrollment.course_id == course_id]
-    for key in enrollments_to_delete:
-        del db["enrollments"][key]
-        
-    del db["courses"][course_id]
+    for student_id in enrollments_by_course.pop(course_id, ()):
+        enrollments_by_student.get(student_id, {}).pop(course_id, None)
+        enrollment = db["enrollments"].pop(_ekey(student_id, course_id))
+        apply_grade_change(student_id, course.credits, enrollment.grade, None)
     return
 
 # --- Enrollment Endpoints ---
@@ -287,67 +350,93 @@ def enroll_student_in_course(enrollment: EnrollmentCreate):
     if course.enrolled_students >= course.max_capacity:
         raise HTTPException(status_code=400, detail="Course is full")
     
-    if (student_id, course_id) in db["enrollments"]:
+    if _ekey(student_id, course_id) in db["enrollments"]:
         raise HTTPException(status_code=400, detail="Student is already enrolled in this course")
 
-    new_enrollment = Enrollment(**enrollment.model_dump())
-    db["enrollments"][(student_id, course_id)] = new_enrollment
+    new_enrollment = Enrollment.model_construct(**enrollment.__dict__)
+    db["enrollments"][_ekey(student_id, course_id)] = new_enrollment
+    enrollments_by_student.setdefault(student_id, {})[course_id] = None
+    enrollments_by_course.setdefault(course_id, {})[student_id] = None
     course.enrolled_students += 1
     return new_enrollment
 
-@app.get("/enrollments/", response_model=List[Enrollment], tags=["Enrollments"])
+@app.get("/enrollments/", response_model=list[Enrollment], tags=["Enrollments"])
 def get_all_enrollments():
-    return list(db["enrollments"].values())
+    return json_list_response(ENROLLMENT_LIST, list(db["enrollments"].values()))
 
 @app.put("/enrollments/{student_id}/{course_id}", response_model=Enrollment, tags=["Enrollments"])
-def update_enrollment_grade(student_id: int, course_id: int, grade: str = Query(..., description="The new grade (A, B, C, D, F)")):
-    if grade.upper() not in GRADE_TO_POINTS:
-        raise HTTPException(status_code=400, detail="Invalid grade. Must be one of A, B, C, D, F.")
-    
-    enrollment_key = (student_id, course_id)
-    if enrollment_key not in db["enrollments"]:
+def update_enrollment_grade(student_id: int = Path(..., ge=0, lt=ID_LIMIT), course_id: int = Path(..., ge=0, lt=ID_LIMIT), grade: Grade = Query(..., description="The new grade (A, B, C, D, F)")):
+    enrollment = db["enrollments"].get(_ekey(student_id, course_id))
+    if enrollment is None:
         raise HTTPException(status_code=404, detail="Enrollment record not found")
     
-    db["enrollments"][enrollment_key].grade = grade.upper()
-    calculate_gpa(student_id) # Recalculate GPA after updating a grade
-    return db["enrollments"][enrollment_key]
+    old_grade, enrollment.grade = enrollment.grade, grade
+    course = db["courses"].get(course_id)
+    if course:
+        apply_grade_change(student_id, course.credits, old_grade, grade)
+    return enrollment
 
 @app.delete("/enrollments/{student_id}/{course_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Enrollments"])
-def drop_course(student_id: int, course_id: int):
-    enrollment_key = (student_id, course_id)
-    if enrollment_key not in db["enrollments"]:
+def drop_course(student_id: int = Path(..., ge=0, lt=ID_LIMIT), course_id: int = Path(..., ge=0, lt=ID_LIMIT)):
+    enrollment = db["enrollments"].pop(_ekey(student_id, course_id), None)
+    if enrollment is None:
         raise HTTPException(status_code=404, detail="Enrollment record not found")
     
-    if course_id in db["courses"]:
-        db["courses"][course_id].enrolled_students -= 1
+    course = db["courses"].get(course_id)
+    if course:
+        course.enrolled_students -= 1
     
-    del db["enrollments"][enrollment_key]
-    calculate_gpa(student_id)
+    enrollments_by_student[student_id].pop(course_id, None)
+    enrollments_by_course[course_id].pop(student_id, None)
+    if course:
+        apply_grade_change(student_id, course.credits, enrollment.grade, None)
     return
 
 # --- Complex Query Endpoints ---
-@app.get("/students/{student_id}/courses", response_model=List[Course], tags=["Students"])
+@app.get("/students/{student_id}/courses", response_model=list[Course], tags=["Students"])
 def get_student_courses(student_id: int):
     if student_id not in db["students"]:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    enrolled_course_ids = [e.course_id for e in db["enrollments"].values() if e.student_id == student_id]
-    student_courses = [db["courses"][cid] for cid in enrolled_course_ids if cid in db["courses"]]
+    student_courses = [db["courses"][cid] for cid in enrollments_by_student.get(student_id, ()) if cid in db["courses"]]
     return student_courses
 
-@app.get("/courses/{course_id}/students", response_model=List[Student], tags=["Courses"])
+@app.get("/courses/{course_id}/students", response_model=list[Student], tags=["Courses"])
 def get_course_roster(course_id: int):
     if course_id not in db["courses"]:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    enrolled_student_ids = [e.student_id for e in db["enrollments"].values() if e.course_id == course_id]
-    course_roster = [db["students"][sid] for sid in enrolled_student_ids if sid in db["students"]]
+    course_roster = [db["students"][sid] for sid in enrollments_by_course.get(course_id, ()) if sid in db["students"]]
     return course_roster
 
-@app.get("/professors/{professor_id}/courses", response_model=List[Course], tags=["Professors"])
+@app.get("/professors/{professor_id}/courses", response_model=list[Course], tags=["Professors"])
 def get_professor_teaching_schedule(professor_id: int):
     if professor_id not in db["professors"]:
         raise HTTPException(status_code=404, detail="Professor not found")
     
     professor_courses = [course for course in db["courses"].values() if course.professor_id == professor_id]
     return professor_courses
+
+# --- Admin Endpoints ---
+@app.post("/admin/recompute-gpas", tags=["Admin"])
+def recompute_all_gpas():
+    """Reseeds every student's GPA totals in a single pass over the enrollment table (e.g. at term end)."""
+    # Same rule as calculate_gpa: every stored grade is a Grade member, so only ungraded rows are skipped
+    points_table = GRADE_TO_POINTS
+    courses = db["courses"]
+    totals = {student_id: [0.0, 0] for student_id in db["students"]}
+    for enrollment in db["enrollments"].values():
+        course = courses.get(enrollment.course_id)
+        student_totals = totals.get(enrollment.student_id)
+        if course is None or enrollment.grade is None or student_totals is None:
+            continue
+        credits = course.credits
+        student_totals[0] += points_table[enrollment.grade] * credits
+        student_totals[1] += credits
+
+    for student_id, (total_points, total_credits) in totals.items():
+        student = db["students"][student_id]
+        student._total_points = total_points
+        student._total_credits = total_credits
+        refresh_gpa(student)
+    return {"message": "GPAs recomputed", "students_updated": len(totals)}